@@ -373,7 +373,8 @@ class ConnectionHelper(object):
                 instead of an enabled flag.
 
         Returns:
-            bool: If a change was made or not.
+            tuple: If a change was made or not, and the diff.  The diff is
+                None if Ansible was not run with --diff.
         """
         supported_states = ["present", "absent"]
         if enabled_disabled_param is not None:
@@ -395,14 +396,16 @@ class ConnectionHelper(object):
                 )
             )
 
-        # Apply the state.
+        # Apply the state.  The diff is only rendered if Ansible will show it.
+        want_diff = getattr(module, "_diff", True)
         changed = False
         diff = None
         if module.params["state"] == "present":
             for item in listing:
                 if item.uid != obj.uid:
                     continue
-                diff = dict(before=eltostr(item))
+                if want_diff:
+                    diff = dict(before=eltostr(item))
                 obj_child_types = [x.__class__ for x in obj.children]
                 other_children = []
                 for x in item.children:
@@ -413,7 +416,8 @@ class ConnectionHelper(object):
                 if not item.equal(obj, compare_children=True):
                     changed = True
                     obj.extend(other_children)
-                    diff["after"] = eltostr(obj)
+                    if want_diff:
+                        diff["after"] = eltostr(obj)
                     if not module.check_mode:
                         try:
                             obj.apply()
@@ -422,7 +426,8 @@ class ConnectionHelper(object):
                 break
             else:
                 changed = True
-                diff = dict(before="", after=eltostr(obj))
+                if want_diff:
+                    diff = dict(before="", after=eltostr(obj))
                 if not module.check_mode:
                     try:
                         obj.create()
@@ -431,7 +436,8 @@ class ConnectionHelper(object):
         elif module.params["state"] == "absent":
             if obj.uid in [x.uid for x in listing]:
                 changed = True
-                diff = dict(before=eltostr(obj), after="")
+                if want_diff:
+                    diff = dict(before=eltostr(obj), after="")
                 if not module.check_mode:
                     try:
                         obj.delete()
@@ -452,9 +458,11 @@ class ConnectionHelper(object):
                     changed = True
 
                 if changed:
-                    diff = dict(before=eltostr(item))
+                    if want_diff:
+                        diff = dict(before=eltostr(item))
                     setattr(item, enabled_disabled_param, not val)
-                    diff["after"] = eltostr(item)
+                    if want_diff:
+                        diff["after"] = eltostr(item)
                     if not module.check_mode:
                         try:
                             item.update(enabled_disabled_param)
@@ -467,6 +475,35 @@ class ConnectionHelper(object):
 
         return changed, diff
 
+    def bulk_apply_state(self, objs, listing, module):
+        """Generic state handling for multiple objects.
+
+        This applies apply_state() to each object in "objs", but indexes
+        "listing" by uid once up front, so each object is only compared to
+        the configured object of the same name instead of scanning the
+        entire listing.
+
+        Note:  Objects are applied one at a time.  All objects share their
+        device's single xapi instance, which stores each API response on
+        itself, so applying them from multiple threads is not safe.
+
+        Args:
+            objs(list): The pandevice objects to be applied.
+            listing(list): List of objects currently configured.
+            module: The Ansible module.
+
+        Returns:
+            list: A (changed, diff) tuple for each object in "objs".
+        """
+        existing = dict((x.uid, x) for x in listing)
+
+        ans = []
+        for obj in objs:
+            item = existing.get(obj.uid)
+            ans.append(self.apply_state(obj, [] if item is None else [item], module))
+
+        return ans
+
     def apply_position(self, obj, location, existing_rule, module):
         """Moves an object into the given location.
 
@@ -17,11 +17,17 @@
 
 from __future__ import absolute_import, division, print_function
 
+import json
+import os
+import time
+import xml.etree.ElementTree as ET
+from operator import attrgetter, itemgetter
+
+from ansible.module_utils._text import to_text
 from ansible.module_utils.basic import AnsibleModule
 from ansible_collections.paloaltonetworks.panos.plugins.module_utils.panos import (
     get_connection,
 )
-from panos.policies import RuleAuditComment
 
 __metaclass__ = type
 
@@ -44,6 +50,12 @@ requirements:
 notes:
     - Checkmode is supported.
     - Panorama is supported.
+    - Each invocation of this module opens its own connection to PAN-OS.  When managing many
+      rules, use I(rules) instead of looping over this module so that a single connection
+      and rulebase retrieval is shared by all of them.
+    - Commits are slow.  Rather than using the deprecated I(commit) option, leave it off for
+      every rule task and run M(panos_commit_firewall) or M(panos_commit_panorama) once
+      after all rule changes.
 extends_documentation_fragment:
     - paloaltonetworks.panos.fragments.transitional_provider
     - paloaltonetworks.panos.fragments.state
@@ -55,8 +67,8 @@ options:
     rule_name:
         description:
             - Name of the security rule.
+            - Required unless I(rules) is specified.
         type: str
-        required: true
     source_zone:
         description:
             - List of source zones.
@@ -254,6 +266,203 @@ options:
         description:
             - Add an audit comment to the rule being defined.
         type: str
+    rules:
+        description:
+            - List of dicts, each describing a security rule to apply in a single module
+              invocation.  The full rule listing is retrieved once for all rules;
+              positioning a rule with I(location) does one name-only lookup per rule.
+            - Each dict accepts the per-rule options of this module.  Any option not
+              given falls back to the top-level value.
+            - Mutually exclusive with I(rule_name).
+        type: list
+        elements: dict
+        suboptions:
+            rule_name:
+                description:
+                    - Name of the security rule.
+                required: true
+                type: str
+            source_zone:
+                description:
+                    - Overrides I(source_zone) for this rule.
+                type: list
+                elements: str
+            destination_zone:
+                description:
+                    - Overrides I(destination_zone) for this rule.
+                type: list
+                elements: str
+            source_ip:
+                description:
+                    - Overrides I(source_ip) for this rule.
+                type: list
+                elements: str
+            source_user:
+                description:
+                    - Overrides I(source_user) for this rule.
+                type: list
+                elements: str
+            hip_profiles:
+                description:
+                    - Overrides I(hip_profiles) for this rule.
+                type: list
+                elements: str
+            destination_ip:
+                description:
+                    - Overrides I(destination_ip) for this rule.
+                type: list
+                elements: str
+            application:
+                description:
+                    - Overrides I(application) for this rule.
+                type: list
+                elements: str
+            service:
+                description:
+                    - Overrides I(service) for this rule.
+                type: list
+                elements: str
+            category:
+                description:
+                    - Overrides I(category) for this rule.
+                type: list
+                elements: str
+            action:
+                description:
+                    - Overrides I(action) for this rule.
+                type: str
+                choices:
+                    - allow
+                    - deny
+                    - drop
+                    - reset-client
+                    - reset-server
+                    - reset-both
+            log_setting:
+                description:
+                    - Overrides I(log_setting) for this rule.
+                type: str
+            log_start:
+                description:
+                    - Overrides I(log_start) for this rule.
+                type: bool
+            log_end:
+                description:
+                    - Overrides I(log_end) for this rule.
+                type: bool
+            description:
+                description:
+                    - Overrides I(description) for this rule.
+                type: str
+            rule_type:
+                description:
+                    - Overrides I(rule_type) for this rule.
+                type: str
+                choices:
+                    - universal
+                    - intrazone
+                    - interzone
+            tag_name:
+                description:
+                    - Overrides I(tag_name) for this rule.
+                type: list
+                elements: str
+            negate_source:
+                description:
+                    - Overrides I(negate_source) for this rule.
+                type: bool
+            negate_destination:
+                description:
+                    - Overrides I(negate_destination) for this rule.
+                type: bool
+            disabled:
+                description:
+                    - Overrides I(disabled) for this rule.
+                type: bool
+            schedule:
+                description:
+                    - Overrides I(schedule) for this rule.
+                type: str
+            icmp_unreachable:
+                description:
+                    - Overrides I(icmp_unreachable) for this rule.
+                type: bool
+            disable_server_response_inspection:
+                description:
+                    - Overrides I(disable_server_response_inspection) for this rule.
+                type: bool
+            group_profile:
+                description:
+                    - Overrides I(group_profile) for this rule.
+                type: str
+            antivirus:
+                description:
+                    - Overrides I(antivirus) for this rule.
+                type: str
+            spyware:
+                description:
+                    - Overrides I(spyware) for this rule.
+                type: str
+            vulnerability:
+                description:
+                    - Overrides I(vulnerability) for this rule.
+                type: str
+            url_filtering:
+                description:
+                    - Overrides I(url_filtering) for this rule.
+                type: str
+            file_blocking:
+                description:
+                    - Overrides I(file_blocking) for this rule.
+                type: str
+            wildfire_analysis:
+                description:
+                    - Overrides I(wildfire_analysis) for this rule.
+                type: str
+            data_filtering:
+                description:
+                    - Overrides I(data_filtering) for this rule.
+                type: str
+            target:
+                description:
+                    - Overrides I(target) for this rule.
+                type: list
+                elements: str
+            negate_target:
+                description:
+                    - Overrides I(negate_target) for this rule.
+                type: bool
+            location:
+                description:
+                    - Overrides I(location) for this rule.
+                type: str
+                choices:
+                    - top
+                    - bottom
+                    - before
+                    - after
+            existing_rule:
+                description:
+                    - Overrides I(existing_rule) for this rule.
+                type: str
+            audit_comment:
+                description:
+                    - Overrides I(audit_comment) for this rule.
+                type: str
+    rule_cache_path:
+        description:
+            - Path to a file on the managed host used to cache the current rulebase between
+              module invocations.  When the cache is fresh, the rulebase is loaded from this
+              file instead of being retrieved from PAN-OS.
+            - The cache is removed before this module changes the rulebase, and only
+              saved again by runs that change nothing.  Changes made outside of this
+              module are not detected until the cache expires.
+        type: path
+    rule_cache_ttl:
+        description:
+            - Number of seconds that I(rule_cache_path) is considered fresh.
+        type: int
+        default: 60
 """
 
 EXAMPLES = """
@@ -335,6 +544,25 @@ EXAMPLES = """
     action: 'allow'
     location: 'before'
     existing_rule: 'Allow MySQL'
+
+- name: add several rules in a single task
+  panos_security_rule:
+    provider: '{{ provider }}'
+    source_zone: ['untrust']
+    destination_zone: ['trust']
+    action: 'allow'
+    rules:
+      - rule_name: 'Allow SSH'
+        application: ['ssh']
+      - rule_name: 'Allow HTTPS'
+        application: ['ssl']
+        service: ['service-https']
+  register: result
+
+- name: commit once after all rule changes
+  panos_commit_firewall:
+    provider: '{{ provider }}'
+  when: result is changed
 """
 
 RETURN = """
@@ -358,78 +586,266 @@ ACCEPTABLE_MOVE_ERRORS = (
     "already at the bottom",
 )
 
+# Default for the list params that match anything.  Ansible copies list
+# defaults into module.params when validating elements, so sharing it is safe.
+_ANY = ["any"]
+
+_ARGUMENT_SPEC = dict(
+    rule_name=dict(),
+    source_zone=dict(type="list", elements="str", default=_ANY),
+    source_ip=dict(type="list", elements="str", default=_ANY),
+    source_user=dict(type="list", elements="str", default=_ANY),
+    hip_profiles=dict(type="list", elements="str", default=_ANY),
+    destination_zone=dict(type="list", elements="str", default=_ANY),
+    destination_ip=dict(type="list", elements="str", default=_ANY),
+    application=dict(type="list", elements="str", default=_ANY),
+    service=dict(type="list", elements="str", default=["application-default"]),
+    category=dict(type="list", elements="str", default=_ANY),
+    action=dict(
+        default="allow",
+        choices=[
+            "allow",
+            "deny",
+            "drop",
+            "reset-client",
+            "reset-server",
+            "reset-both",
+        ],
+    ),
+    log_setting=dict(),
+    log_start=dict(type="bool", default=False),
+    log_end=dict(type="bool", default=True),
+    description=dict(),
+    rule_type=dict(
+        default="universal", choices=["universal", "intrazone", "interzone"]
+    ),
+    tag_name=dict(type="list", elements="str"),
+    negate_source=dict(type="bool", default=False),
+    negate_destination=dict(type="bool", default=False),
+    disabled=dict(type="bool", default=False),
+    schedule=dict(),
+    icmp_unreachable=dict(type="bool"),
+    disable_server_response_inspection=dict(type="bool", default=False),
+    group_profile=dict(),
+    antivirus=dict(),
+    spyware=dict(),
+    vulnerability=dict(),
+    url_filtering=dict(),
+    file_blocking=dict(),
+    wildfire_analysis=dict(),
+    data_filtering=dict(),
+    target=dict(type="list", elements="str"),
+    negate_target=dict(type="bool"),
+    location=dict(choices=["top", "bottom", "before", "after"]),
+    existing_rule=dict(),
+    commit=dict(type="bool", default=False),
+    audit_comment=dict(type="str"),
+    rules=dict(type="list", elements="dict"),
+    rule_cache_path=dict(type="path"),
+    rule_cache_ttl=dict(type="int", default=60),
+    # TODO(gfreeman) - remove this in the next role release.
+    devicegroup=dict(),
+)
 
-def main():
-    helper = get_connection(
-        vsys=True,
-        device_group=True,
-        rulebase=True,
-        with_state=True,
-        with_classic_provider_spec=True,
-        error_on_firewall_shared=True,
-        argument_spec=dict(
-            rule_name=dict(required=True),
-            source_zone=dict(type="list", elements="str", default=["any"]),
-            source_ip=dict(type="list", elements="str", default=["any"]),
-            source_user=dict(type="list", elements="str", default=["any"]),
-            hip_profiles=dict(type="list", elements="str", default=["any"]),
-            destination_zone=dict(
-                type="list", elements="str", default=["any"]),
-            destination_ip=dict(type="list", elements="str", default=["any"]),
-            application=dict(type="list", elements="str", default=["any"]),
-            service=dict(type="list", elements="str",
-                         default=["application-default"]),
-            category=dict(type="list", elements="str", default=["any"]),
-            action=dict(
-                default="allow",
-                choices=[
-                    "allow",
-                    "deny",
-                    "drop",
-                    "reset-client",
-                    "reset-server",
-                    "reset-both",
-                ],
-            ),
-            log_setting=dict(),
-            log_start=dict(type="bool", default=False),
-            log_end=dict(type="bool", default=True),
-            description=dict(),
-            rule_type=dict(
-                default="universal", choices=["universal", "intrazone", "interzone"]
-            ),
-            tag_name=dict(type="list", elements="str"),
-            negate_source=dict(type="bool", default=False),
-            negate_destination=dict(type="bool", default=False),
-            disabled=dict(type="bool", default=False),
-            schedule=dict(),
-            icmp_unreachable=dict(type="bool"),
-            disable_server_response_inspection=dict(
-                type="bool", default=False),
-            group_profile=dict(),
-            antivirus=dict(),
-            spyware=dict(),
-            vulnerability=dict(),
-            url_filtering=dict(),
-            file_blocking=dict(),
-            wildfire_analysis=dict(),
-            data_filtering=dict(),
-            target=dict(type="list", elements="str"),
-            negate_target=dict(type="bool"),
-            location=dict(choices=["top", "bottom", "before", "after"]),
-            existing_rule=dict(),
-            commit=dict(type="bool", default=False),
-            audit_comment=dict(type="str"),
-            # TODO(gfreeman) - remove this in the next role release.
-            devicegroup=dict(),
-        ),
-    )
-    module = AnsibleModule(
-        argument_spec=helper.argument_spec,
-        supports_check_mode=True,
-        required_one_of=helper.required_one_of,
-    )
+# SecurityRule object params and the module params they are taken from.
+_PARAM_MAP = (
+    ("name", "rule_name"),
+    ("fromzone", "source_zone"),
+    ("tozone", "destination_zone"),
+    ("source", "source_ip"),
+    ("source_user", "source_user"),
+    ("hip_profiles", "hip_profiles"),
+    ("destination", "destination_ip"),
+    ("application", "application"),
+    ("service", "service"),
+    ("category", "category"),
+    ("action", "action"),
+    ("log_setting", "log_setting"),
+    ("log_start", "log_start"),
+    ("log_end", "log_end"),
+    ("description", "description"),
+    ("type", "rule_type"),
+    ("tag", "tag_name"),
+    ("negate_source", "negate_source"),
+    ("negate_destination", "negate_destination"),
+    ("disabled", "disabled"),
+    ("schedule", "schedule"),
+    ("icmp_unreachable", "icmp_unreachable"),
+    ("disable_server_response_inspection", "disable_server_response_inspection"),
+    ("group", "group_profile"),
+    ("virus", "antivirus"),
+    ("spyware", "spyware"),
+    ("vulnerability", "vulnerability"),
+    ("url_filtering", "url_filtering"),
+    ("file_blocking", "file_blocking"),
+    ("wildfire_analysis", "wildfire_analysis"),
+    ("data_filtering", "data_filtering"),
+    ("target", "target"),
+    ("negate_target", "negate_target"),
+)
+
+# Params applied after the rule itself, which are not SecurityRule params.
+_EXTRA_PARAM_MAP = (
+    ("location", "location"),
+    ("existing_rule", "existing_rule"),
+    ("audit_comment", "audit_comment"),
+)
+
+# Module params that may be given per rule in the "rules" list.
+RULE_PARAMS = tuple(x[1] for x in _PARAM_MAP + _EXTRA_PARAM_MAP)
+
+# The "rules" entries take the same options as the top level, minus the
+# defaults, so an option left out of an entry is None and RuleSpec falls back
+# to the top-level value instead.
+_ARGUMENT_SPEC["rules"]["options"] = dict(
+    (x, dict((k, v) for k, v in _ARGUMENT_SPEC[x].items() if k != "default"))
+    for x in RULE_PARAMS
+)
+_ARGUMENT_SPEC["rules"]["options"]["rule_name"]["required"] = True
+
+# Fetch all rule values from the module params / a RuleSpec in a single call.
+_SECURITY_RULE_ATTRS = tuple(x[0] for x in _PARAM_MAP)
+_get_rule_params = itemgetter(*RULE_PARAMS)
+_get_security_rule_attrs = attrgetter(*_SECURITY_RULE_ATTRS)
+
+
+class RuleSpec(object):
+    """The params of a single security rule.
+
+    Uses slots instead of a per-rule copy of the module params, which keeps
+    the memory used by large "rules" lists down.
+    """
+
+    __slots__ = tuple(x[0] for x in _PARAM_MAP + _EXTRA_PARAM_MAP)
+
+    def __init__(self, params, overrides=None):
+        """Takes each value from "overrides" if not None, else from "params"."""
+        for attr, value in zip(self.__slots__, _get_rule_params(params)):
+            setattr(self, attr, value)
+        if overrides:
+            for attr, param in _PARAM_MAP + _EXTRA_PARAM_MAP:
+                if overrides.get(param) is not None:
+                    setattr(self, attr, overrides[param])
+
+    def security_rule_params(self):
+        """Returns the SecurityRule object params."""
+        return dict(zip(_SECURITY_RULE_ATTRS, _get_security_rule_attrs(self)))
+
+
+def rule_cache_key(module):
+    """Returns the key identifying the rulebase stored in the rule cache."""
+    provider = module.params["provider"] or {}
+    return [
+        provider.get("ip_address") or module.params.get("ip_address"),
+        provider.get("serial_number"),
+        module.params["device_group"],
+        module.params["vsys"],
+        module.params["rulebase"],
+    ]
+
+
+def load_rule_cache(module, parent):
+    """Returns the cached rules and when they were retrieved from PAN-OS.
+
+    Returns (None, None) if the cache is missing or stale.
+    """
+    path = module.params["rule_cache_path"]
+    if path is None or not os.path.isfile(path):
+        return None, None
 
+    try:
+        with open(path) as fd:
+            data = json.load(fd)
+        if data["key"] != rule_cache_key(module):
+            return None, None
+        if time.time() - data["time"] > module.params["rule_cache_ttl"]:
+            return None, None
+        root = ET.fromstring("<rules>{0}</rules>".format("".join(data["rules"])))
+    except (IOError, ValueError, KeyError, TypeError, ET.ParseError):
+        return None, None
+
+    proto = SecurityRule()
+    proto.parent = parent
+    return proto.refreshall_from_xml(root), data["time"]
+
+
+def save_rule_cache(module, rules, retrieved):
+    """Saves the given rules to the rule cache, if one is configured.
+
+    "retrieved" is when the rules were retrieved from PAN-OS, which is what
+    the cache TTL is measured from.
+    """
+    path = module.params["rule_cache_path"]
+    if path is None:
+        return
+
+    data = {
+        "key": rule_cache_key(module),
+        "time": retrieved,
+        "rules": [to_text(x.element_str()) for x in rules],
+    }
+    try:
+        with open(path, "w") as fd:
+            json.dump(data, fd)
+    except IOError as e:
+        module.warn("Failed to save rule cache: {0}".format(e))
+
+
+def clear_rule_cache(module):
+    """Removes the rule cache, if one is configured."""
+    path = module.params["rule_cache_path"]
+    if path is not None and os.path.isfile(path):
+        try:
+            os.remove(path)
+        except OSError as e:
+            module.warn("Failed to remove rule cache: {0}".format(e))
+
+
+def refresh_single(module, parent, name):
+    """Returns a listing of just the named rule, retrieved by its xpath.
+
+    This avoids retrieving and parsing the entire rulebase when only one
+    rule is of interest.  The rule is fetched the same way refreshall() does
+    it, since refresh() reports every API error as a missing object.
+    """
+    proto = SecurityRule(name)
+    proto.parent = parent
+    try:
+        root = proto.nearest_pandevice().xapi.get(
+            proto.xpath(), retry_on_peer=proto.HA_SYNC
+        )
+    except PanDeviceError as e:
+        if str(e).startswith("No such node"):
+            return []
+        module.fail_json(msg="Failed refresh: {0}".format(e))
+
+    return proto.refreshall_from_xml(root.find("result"))
+
+
+def get_rule_specs(module):
+    """Returns a list of RuleSpec objects for the rules to be applied.
+
+    If "rules" is specified, each entry is layered on top of the top-level
+    module params, otherwise the module params themselves are the only rule.
+    """
+    if not module.params["rules"]:
+        return [RuleSpec(module.params)]
+
+    ans = []
+    names = set()
+    for item in module.params["rules"]:
+        if item["rule_name"] in names:
+            module.fail_json(
+                msg='Duplicate rule_name in rules: "{0}"'.format(item["rule_name"])
+            )
+        names.add(item["rule_name"])
+        ans.append(RuleSpec(module.params, item))
+
+    return ans
+
+
+def _validate_params(module, rule_specs):
+    """Checks param combinations that do not need a connection to PAN-OS."""
     # TODO(gfreeman) - remove when devicegroup is removed.
     if module.params["devicegroup"] is not None:
         module.deprecate(
@@ -445,83 +861,112 @@ def main():
             module.fail_json(msg=". ".join(msg))
         module.params["device_group"] = module.params["devicegroup"]
 
-    # Verify imports, build pandevice object tree.
-    parent = helper.get_pandevice_parent(module)
+    # Same check as apply_position(), which only runs after rules are applied.
+    if module.params["state"] == "present":
+        for spec in rule_specs:
+            improper_combo = False
+            improper_combo |= spec.location is None and spec.existing_rule is not None
+            improper_combo |= (
+                spec.location in ("before", "after") and spec.existing_rule is None
+            )
+            improper_combo |= (
+                spec.location in ("top", "bottom") and spec.existing_rule is not None
+            )
+            if improper_combo:
+                module.fail_json(
+                    msg='Improper combination of "location" / "existing_rule" '
+                    'for rule "{0}".'.format(spec.name)
+                )
 
-    # Set the SecurityRule object params.
-    rule_spec = {
-        "name": module.params["rule_name"],
-        "fromzone": module.params["source_zone"],
-        "tozone": module.params["destination_zone"],
-        "source": module.params["source_ip"],
-        "source_user": module.params["source_user"],
-        "hip_profiles": module.params["hip_profiles"],
-        "destination": module.params["destination_ip"],
-        "application": module.params["application"],
-        "service": module.params["service"],
-        "category": module.params["category"],
-        "action": module.params["action"],
-        "log_setting": module.params["log_setting"],
-        "log_start": module.params["log_start"],
-        "log_end": module.params["log_end"],
-        "description": module.params["description"],
-        "type": module.params["rule_type"],
-        "tag": module.params["tag_name"],
-        "negate_source": module.params["negate_source"],
-        "negate_destination": module.params["negate_destination"],
-        "disabled": module.params["disabled"],
-        "schedule": module.params["schedule"],
-        "icmp_unreachable": module.params["icmp_unreachable"],
-        "disable_server_response_inspection": module.params[
-            "disable_server_response_inspection"
-        ],
-        "group": module.params["group_profile"],
-        "virus": module.params["antivirus"],
-        "spyware": module.params["spyware"],
-        "vulnerability": module.params["vulnerability"],
-        "url_filtering": module.params["url_filtering"],
-        "file_blocking": module.params["file_blocking"],
-        "wildfire_analysis": module.params["wildfire_analysis"],
-        "data_filtering": module.params["data_filtering"],
-        "target": module.params["target"],
-        "negate_target": module.params["negate_target"],
 
-    }
+def main():
+    helper = get_connection(
+        vsys=True,
+        device_group=True,
+        rulebase=True,
+        with_state=True,
+        with_classic_provider_spec=True,
+        error_on_firewall_shared=True,
+        argument_spec=_ARGUMENT_SPEC,
+        required_one_of=[["rule_name", "rules"]],
+    )
+    module = AnsibleModule(
+        argument_spec=helper.argument_spec,
+        supports_check_mode=True,
+        required_one_of=helper.required_one_of,
+        mutually_exclusive=[["rule_name", "rules"]],
+    )
 
     # Other module info.
-    location = module.params["location"]
-    existing_rule = module.params["existing_rule"]
     commit = module.params["commit"]
-    audit_comment = module.params["audit_comment"]
-
-    # Retrieve the current rules.
-    try:
-        rules = SecurityRule.refreshall(parent, add=False)
-    except PanDeviceError as e:
-        module.fail_json(msg="Failed refresh: {0}".format(e))
-
-    # Create new rule object from the params.
-    new_rule = SecurityRule(**rule_spec)
-    parent.add(new_rule)
+    rule_specs = get_rule_specs(module)
 
-    # Which action shall we take on the rule object?
-    changed, diff = helper.apply_state(new_rule, rules, module)
+    # Fail before connecting to PAN-OS if the params can never work.
+    _validate_params(module, rule_specs)
 
-    # Move the rule to the correct spot, if applicable.
-    if module.params["state"] == "present":
-        changed |= helper.apply_position(
-            new_rule, location, existing_rule, module)
+    # Verify imports, build pandevice object tree.
+    parent = helper.get_pandevice_parent(module)
 
-    # Add the audit comment, if applicable.
-    if changed and audit_comment and not module.check_mode:
-        new_rule.opstate.audit_comment.update(audit_comment)
+    # Retrieve the current rules once for every rule being applied.  Deleting
+    # a single rule only needs that one rule.
+    rules, retrieved = load_rule_cache(module, parent)
+    if rules is None and module.params["state"] == "absent" and len(rule_specs) == 1:
+        rules = refresh_single(module, parent, rule_specs[0].name)
+    elif rules is None:
+        retrieved = time.time()
+        try:
+            rules = SecurityRule.refreshall(parent, add=False)
+        except PanDeviceError as e:
+            module.fail_json(msg="Failed refresh: {0}".format(e))
+
+    # Remove the cache before changing anything, so that a failure part way
+    # through cannot leave the old rulebase cached.
+    if not module.check_mode:
+        clear_rule_cache(module)
+
+    # Create new rule objects from the params; deletion only needs the name.
+    new_rules = []
+    for spec in rule_specs:
+        if module.params["state"] == "absent":
+            new_rule = SecurityRule(spec.name)
+        else:
+            new_rule = SecurityRule(**spec.security_rule_params())
+        parent.add(new_rule)
+        new_rules.append(new_rule)
+
+    # Which action shall we take on the rule objects?
+    results = helper.bulk_apply_state(new_rules, rules, module)
+
+    changed = False
+    diffs = []
+    for new_rule, spec, (rule_changed, diff) in zip(new_rules, rule_specs, results):
+        # Move the rule to the correct spot, if applicable.
+        if module.params["state"] == "present":
+            rule_changed |= helper.apply_position(
+                new_rule, spec.location, spec.existing_rule, module
+            )
+
+        # Add the audit comment, if applicable.
+        if rule_changed and spec.audit_comment and not module.check_mode:
+            new_rule.opstate.audit_comment.update(spec.audit_comment)
+
+        changed |= rule_changed
+        diffs.append(diff)
+
+    # Nothing changed, so the full listing (if retrieved) still matches PAN-OS.
+    if not changed and retrieved is not None:
+        save_rule_cache(module, rules, retrieved)
 
     # Optional commit.
     if changed and commit:
         helper.commit(module)
 
     # Done.
-    module.exit_json(changed=changed, diff=diff, msg="Done")
+    if not module.params["rules"]:
+        diffs = diffs[0]
+    else:
+        diffs = [x for x in diffs if x is not None]
+    module.exit_json(changed=changed, diff=diffs, msg="Done")
 
 
 if __name__ == "__main__":
@@ -29,7 +29,7 @@ from ansible_collections.paloaltonetworks.panos.plugins.module_utils.panos impor
 from panos.errors import PanDeviceError
 from panos.firewall import Firewall
 from panos.panorama import DeviceGroup, Panorama, Template, TemplateStack
-from panos.policies import PostRulebase, PreRulebase, Rulebase
+from panos.policies import PostRulebase, PreRulebase, Rulebase, SecurityRule
 
 
 # Run all tests with mocked firewall unless specified.
@@ -440,3 +440,36 @@ def test_firewall_error(module_mock):
         parent = helper.get_pandevice_parent(module_mock)
 
     assert e.match("FIREWALL ERROR")
+
+
+# apply_state() / bulk_apply_state()
+
+# Each object is only compared against the configured object of the same name.
+@pytest.mark.parametrize(
+    "state,expected",
+    [("present", [True, False, True]), ("absent", [True, True, False])],
+)
+def test_bulk_apply_state(module_mock, state, expected):
+    helper = get_connection(with_state=True, argument_spec=dict())
+    module_mock.params.update({"state": state})
+    module_mock.check_mode = True
+    listing = [SecurityRule("a"), SecurityRule("b")]
+    objs = [SecurityRule("a", action="deny"), SecurityRule("b"), SecurityRule("c")]
+
+    ans = helper.bulk_apply_state(objs, listing, module_mock)
+
+    assert [x[0] for x in ans] == expected
+
+
+# The diff is only rendered when Ansible is run with --diff.
+@pytest.mark.parametrize("want_diff", [True, False])
+def test_apply_state_diff(module_mock, want_diff):
+    helper = get_connection(with_state=True, argument_spec=dict())
+    module_mock.params.update({"state": "present"})
+    module_mock.check_mode = True
+    module_mock._diff = want_diff
+
+    changed, diff = helper.apply_state(SecurityRule("a"), [], module_mock)
+
+    assert changed
+    assert (diff is not None) == want_diff
@@ -0,0 +1,374 @@
+# Copyright 2021 Palo Alto Networks, Inc
+#
+# Permission to use, copy, modify, and/or distribute this software for any
+# purpose with or without fee is hereby granted, provided that the above
+# copyright notice and this permission notice appear in all copies.
+#
+# THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+# WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+# ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+# WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+# ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+# OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import time
+import xml.etree.ElementTree as ET
+from unittest.mock import MagicMock
+
+import pytest
+from ansible.module_utils import basic
+from ansible.module_utils.basic import AnsibleModule
+from ansible_collections.paloaltonetworks.panos.plugins.modules import (
+    panos_security_rule,
+)
+from ansible_collections.paloaltonetworks.panos.plugins.modules.panos_security_rule import (
+    _ARGUMENT_SPEC,
+    RULE_PARAMS,
+    _validate_params,
+    clear_rule_cache,
+    get_rule_specs,
+    load_rule_cache,
+    refresh_single,
+    save_rule_cache,
+)
+
+from panos.errors import PanConnectionTimeout, PanNoSuchNode
+from panos.firewall import Firewall
+from panos.policies import Rulebase, SecurityRule
+
+
+class AnsibleFailJson(Exception):
+    pass
+
+
+def fail_json_exception(*args, **kwargs):
+    raise AnsibleFailJson(kwargs["msg"])
+
+
+@pytest.fixture
+def module_mock():
+    module = MagicMock(spec=AnsibleModule)
+    module.params = dict((x, None) for x in RULE_PARAMS)
+    module.params.update(
+        {
+            "source_zone": ["any"],
+            "destination_zone": ["any"],
+            "action": "allow",
+            "rules": None,
+            "state": "present",
+            "devicegroup": None,
+            "provider": {"ip_address": "192.168.1.1", "serial_number": None},
+            "device_group": None,
+            "vsys": "vsys1",
+            "rulebase": None,
+            "rule_cache_path": None,
+            "rule_cache_ttl": 60,
+        }
+    )
+    module.fail_json = fail_json_exception
+
+    return module
+
+
+# Without "rules", the module params are the only rule.
+def test_single_rule(module_mock):
+    module_mock.params["rule_name"] = "rule1"
+
+    ans = get_rule_specs(module_mock)
+
+    assert len(ans) == 1
+    assert ans[0].security_rule_params()["name"] == "rule1"
+
+
+# Each entry in "rules" is layered on top of the top-level params.
+def test_bulk_rules_inherit_top_level(module_mock):
+    module_mock.params["action"] = "deny"
+    module_mock.params["rules"] = [
+        {"rule_name": "rule1", "source_zone": ["trust"]},
+        {"rule_name": "rule2", "action": "allow"},
+    ]
+
+    ans = [x.security_rule_params() for x in get_rule_specs(module_mock)]
+
+    assert [x["name"] for x in ans] == ["rule1", "rule2"]
+    assert ans[0]["fromzone"] == ["trust"]
+    assert ans[0]["action"] == "deny"
+    assert ans[1]["fromzone"] == ["any"]
+    assert ans[1]["action"] == "allow"
+
+
+# Error if two entries in "rules" have the same name.
+def test_bulk_rules_duplicate_name(module_mock):
+    module_mock.params["rules"] = [
+        {"rule_name": "rule0"},
+        {"rule_name": "rule1"},
+        {"rule_name": "rule0", "action": "deny"},
+    ]
+
+    with pytest.raises(AnsibleFailJson) as e:
+        get_rule_specs(module_mock)
+
+    assert e.match('Duplicate .* "rule0"')
+
+
+# Values in "rules" entries are converted / checked like the top-level params.
+def test_bulk_rules_argspec(mocker):
+    args = {"rules": [{"rule_name": "rule1", "disabled": "no"}], "action": "deny"}
+    mocker.patch.object(basic, "_load_params", return_value=args)
+
+    ans = get_rule_specs(AnsibleModule(argument_spec=_ARGUMENT_SPEC))
+
+    assert ans[0].disabled is False
+    assert ans[0].action == "deny"
+
+
+@pytest.mark.parametrize(
+    "entry,msg",
+    [
+        ({"rule_name": "rule1", "action": "bogus"}, "action"),
+        ({"source_zone": ["trust"]}, "rule_name"),
+        ({"rule_name": "rule1", "commit": True}, "commit"),
+    ],
+)
+def test_bulk_rules_argspec_invalid(mocker, entry, msg):
+    mocker.patch.object(basic, "_load_params", return_value={"rules": [entry]})
+    mocker.patch.object(AnsibleModule, "fail_json", side_effect=fail_json_exception)
+
+    with pytest.raises(AnsibleFailJson) as e:
+        AnsibleModule(argument_spec=_ARGUMENT_SPEC)
+
+    assert e.match(msg)
+
+
+# Error before connecting if any rule has an improper location / existing_rule.
+@pytest.mark.parametrize(
+    "location,existing_rule",
+    [("before", None), ("after", None), ("top", "rule1"), (None, "rule1")],
+)
+def test_validate_location(module_mock, location, existing_rule):
+    module_mock.params["rules"] = [
+        {"rule_name": "rule1"},
+        {"rule_name": "rule2", "location": location, "existing_rule": existing_rule},
+    ]
+
+    with pytest.raises(AnsibleFailJson) as e:
+        _validate_params(module_mock, get_rule_specs(module_mock))
+
+    assert e.match('Improper combination .* rule "rule2"')
+
+
+# Error if both "devicegroup" and "device_group" are specified.
+def test_validate_devicegroup(module_mock):
+    module_mock.params.update({"devicegroup": "dg1", "device_group": "dg2"})
+
+    with pytest.raises(AnsibleFailJson) as e:
+        _validate_params(module_mock, [])
+
+    assert e.match("Specify one or the other")
+
+
+@pytest.fixture
+def rulebase():
+    fw = Firewall("192.168.1.1", "admin", "password", "API_KEY")
+    fw._version_info = (10, 0, 0)
+    rb = Rulebase()
+    fw.add(rb)
+
+    return rb
+
+
+# Rules saved to the rule cache are loaded back unchanged.
+def test_rule_cache_roundtrip(module_mock, rulebase, tmp_path):
+    module_mock.params["rule_cache_path"] = str(tmp_path / "cache.json")
+    rules = [
+        SecurityRule("rule1", fromzone=["trust"], action="deny"),
+        SecurityRule("rule2", application=["ssh"]),
+    ]
+
+    now = time.time()
+
+    save_rule_cache(module_mock, rules, now)
+    ans, retrieved = load_rule_cache(module_mock, rulebase)
+
+    assert retrieved == now
+    assert [x.name for x in ans] == ["rule1", "rule2"]
+    for a, b in zip(ans, rules):
+        assert a.equal(b, compare_children=True)
+
+
+# The rule cache is ignored when stale, for another rulebase, or removed.
+@pytest.mark.parametrize(
+    "param,value", [("rule_cache_ttl", -1), ("vsys", "vsys2"), (None, None)]
+)
+def test_rule_cache_miss(module_mock, rulebase, tmp_path, param, value):
+    module_mock.params["rule_cache_path"] = str(tmp_path / "cache.json")
+    save_rule_cache(module_mock, [SecurityRule("rule1")], time.time())
+
+    if param is None:
+        clear_rule_cache(module_mock)
+    else:
+        module_mock.params[param] = value
+
+    assert load_rule_cache(module_mock, rulebase) == (None, None)
+
+
+# refresh_single() returns just the named rule, or nothing if it does not exist.
+@pytest.mark.parametrize(
+    "result,names",
+    [
+        (
+            '<result><entry name="rule1"><action>deny</action></entry></result>',
+            ["rule1"],
+        ),
+        ("<result/>", []),
+    ],
+)
+def test_refresh_single(module_mock, rulebase, result, names):
+    rulebase.parent._xapi_private = MagicMock()
+    rulebase.parent.xapi.get.return_value = ET.fromstring(
+        '<response status="success">{0}</response>'.format(result)
+    )
+
+    ans = refresh_single(module_mock, rulebase, "rule1")
+
+    assert rulebase.parent.xapi.get.call_args[0][0].endswith("[@name='rule1']")
+    assert [x.name for x in ans] == names
+    assert all(x.action == "deny" for x in ans)
+
+
+def test_refresh_single_no_such_node(module_mock, rulebase):
+    rulebase.parent._xapi_private = MagicMock()
+    rulebase.parent.xapi.get.side_effect = PanNoSuchNode("No such node")
+
+    assert refresh_single(module_mock, rulebase, "rule1") == []
+
+
+# Any other API error fails, rather than being taken as a missing rule.
+def test_refresh_single_api_error(module_mock, rulebase):
+    rulebase.parent._xapi_private = MagicMock()
+    rulebase.parent.xapi.get.side_effect = PanConnectionTimeout("timed out")
+
+    with pytest.raises(AnsibleFailJson) as e:
+        refresh_single(module_mock, rulebase, "rule1")
+
+    assert e.match("Failed refresh: timed out")
+
+
+@pytest.fixture
+def main_mock(mocker, module_mock, rulebase, tmp_path):
+    module_mock.params.update(
+        {
+            "rule_name": "rule1",
+            "commit": False,
+            "rule_cache_path": str(tmp_path / "cache.json"),
+        }
+    )
+    module_mock.check_mode = False
+    mocker.patch.object(panos_security_rule, "AnsibleModule", return_value=module_mock)
+    helper = mocker.patch.object(panos_security_rule, "get_connection").return_value
+    helper.get_pandevice_parent.return_value = rulebase
+    helper.apply_position.return_value = False
+
+    return helper
+
+
+# A run that fails part way through does not leave the old rulebase cached.
+def test_rule_cache_cleared_on_failure(module_mock, rulebase, main_mock):
+    save_rule_cache(module_mock, [SecurityRule("rule1")], time.time())
+    main_mock.bulk_apply_state.side_effect = AnsibleFailJson("Failed apply")
+
+    with pytest.raises(AnsibleFailJson):
+        panos_security_rule.main()
+
+    assert load_rule_cache(module_mock, rulebase) == (None, None)
+
+
+# A run that changes nothing caches the listing as of when it was retrieved.
+@pytest.mark.parametrize("changed", [False, True])
+def test_rule_cache_saved_if_unchanged(module_mock, rulebase, main_mock, changed):
+    save_rule_cache(module_mock, [SecurityRule("rule1")], 1234.5)
+    module_mock.params["rule_cache_ttl"] = time.time()
+    main_mock.bulk_apply_state.return_value = [(changed, None)]
+
+    panos_security_rule.main()
+
+    ans = load_rule_cache(module_mock, rulebase)
+    assert ans[1] == (None if changed else 1234.5)
+
+
+# All "rules" entries share one rule listing and are reported as one result.
+def test_main_bulk_rules(mocker, module_mock, rulebase, main_mock):
+    module_mock.params.update(
+        {
+            "rule_name": None,
+            "rules": [
+                {"rule_name": "rule1"},
+                {"rule_name": "rule2", "action": "deny"},
+                {"rule_name": "rule3", "location": "top"},
+            ],
+        }
+    )
+    listing = [SecurityRule("rule1"), SecurityRule("rule2")]
+    refreshall = mocker.patch.object(SecurityRule, "refreshall", return_value=listing)
+    add = mocker.spy(rulebase, "add")
+    diff = {"before": "<entry/>", "after": "<entry/>"}
+    main_mock.bulk_apply_state.return_value = [
+        (False, None),
+        (True, diff),
+        (False, None),
+    ]
+    main_mock.apply_position.side_effect = [False, False, True]
+
+    panos_security_rule.main()
+
+    refreshall.assert_called_once_with(rulebase, add=False)
+    assert [x[0][0].name for x in add.call_args_list] == ["rule1", "rule2", "rule3"]
+    new_rules, ans_listing, _ = main_mock.bulk_apply_state.call_args[0]
+    assert [x.name for x in new_rules] == ["rule1", "rule2", "rule3"]
+    assert new_rules[1].action == "deny"
+    assert ans_listing is listing
+    module_mock.exit_json.assert_called_once_with(changed=True, diff=[diff], msg="Done")
+
+
+# Deleting only needs the rule names; location is not checked or applied, and a
+# single rule is fetched on its own instead of listing the whole rulebase.
+@pytest.mark.parametrize(
+    "params,names,listed",
+    [
+        ({"rule_name": "rule1", "location": "before"}, ["rule1"], False),
+        (
+            {
+                "rule_name": None,
+                "rules": [
+                    {"rule_name": "rule1", "location": "before"},
+                    {"rule_name": "rule2"},
+                ],
+            },
+            ["rule1", "rule2"],
+            True,
+        ),
+    ],
+)
+def test_main_absent(mocker, module_mock, rulebase, main_mock, params, names, listed):
+    module_mock.params.update(params)
+    module_mock.params["state"] = "absent"
+    rulebase.parent._xapi_private = MagicMock()
+    rulebase.parent.xapi.get.return_value = ET.fromstring(
+        '<response status="success"><result/></response>'
+    )
+    refreshall = mocker.patch.object(SecurityRule, "refreshall", return_value=[])
+    main_mock.bulk_apply_state.return_value = [(True, None)] * len(names)
+
+    panos_security_rule.main()
+
+    assert refreshall.called == listed
+    assert rulebase.parent.xapi.get.called != listed
+    new_rules = main_mock.bulk_apply_state.call_args[0][0]
+    assert [x.name for x in new_rules] == names
+    assert all(x.about() == SecurityRule(x.name).about() for x in new_rules)
+    assert not main_mock.apply_position.called